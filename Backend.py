@@ -1,26 +1,115 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Header, Response
+from fastapi.middleware.gzip import GZipMiddleware
 from Bio import SeqIO
-from Bio.SeqIO.QualityIO import FastqGeneralIterator
+from Bio.SeqIO.FastaIO import SimpleFastaParser
 import io
 import gzip
 import bz2
-from typing import List, Dict, Set, Optional
-
-app = FastAPI(title="Bioinformatics Processing API")
+import json
+import logging
+import os
+import hashlib
+import multiprocessing
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from functools import lru_cache
+import numpy as np
+import orjson
+import ormsgpack
+import pyarrow as pa
+from typing import List, Dict, Set, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Worker pool for per-batch GC computation, created at app startup (None means GC runs inline)
+_executor: Optional[ProcessPoolExecutor] = None
+
+# FASTQ record indexes for /fastq/filter/, keyed by upload digest, least recently used first
+# Each entry is (path of the decompressed FASTQ on disk, its size, (ids, starts, ends) arrays).
+# The cache is bounded by entry count and by the total size of those files and of the index arrays.
+# Cached files are opened under the lock; an open file outlives its eviction (os.remove) on POSIX.
+FASTQ_INDEX_MAX_ENTRIES = 32
+FASTQ_INDEX_MAX_DISK_BYTES = 4 * 1024 ** 3
+FASTQ_INDEX_MAX_MEMORY_BYTES = 256 * 1024 ** 2
+_fastq_index_cache: "OrderedDict[str, Tuple[str, int, Tuple[np.ndarray, np.ndarray, np.ndarray]]]" = OrderedDict()
+_fastq_index_lock = threading.Lock()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _executor
+    # Never fork the (multi-threaded) server: workers come from a fork server, or are spawned
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    workers = os.cpu_count() or 1
+    _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method))
+
+    # Workers start lazily on submit; start them all now, before any request arrives
+    try:
+        for future in [_executor.submit(os.getpid) for _ in range(workers)]:
+            future.result()
+    except BrokenProcessPool:
+        logger.warning("GC worker pool failed to start; computing GC content inline", exc_info=True)
+        _executor.shutdown()
+        _executor = None
+
+    yield
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+    with _fastq_index_lock:
+        while _fastq_index_cache:
+            _, (path, _, _) = _fastq_index_cache.popitem()
+            os.remove(path)
+
+
+app = FastAPI(title="Bioinformatics Processing API", lifespan=lifespan)
+
+# Sequence payloads are low-entropy text, so compressing responses is cheap and shrinks them a lot
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+# Byte translation table: G/C -> 1, A/T/U -> 2, anything else -> 0
+_GC_TABLE = bytes(1 if c in b'GCgc' else 2 if c in b'ATUatu' else 0 for c in range(256))
+
+# Column layout of the "sequences" payload (parallel arrays, one entry per record)
+FASTA_COLUMNS = ("ID", "Description", "Sequence", "Length", "GC_content", "Last_base", "First_base")
+FASTQ_COLUMNS = ("ID", "Title", "Sequence", "Quality", "Length", "GC_content", "Avg_quality")
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# Every supported '<format ext><compression ext>' suffix -> (format, compression)
+FORMAT_EXTENSIONS = {
+    '.fa': 'fasta', '.fasta': 'fasta', '.fna': 'fasta',
+    '.fq': 'fastq', '.fastq': 'fastq',
+    '.gb': 'genbank', '.gbk': 'genbank', '.genbank': 'genbank',
+    '.embl': 'embl'
+}
+COMPRESSION_EXTENSIONS = {'': 'none', '.gz': 'gzip', '.gzip': 'gzip', '.bz2': 'bzip2', '.bzip2': 'bzip2'}
+_SUFFIX_MAP = {
+    format_ext + compression_ext: (file_format, compression)
+    for format_ext, file_format in FORMAT_EXTENSIONS.items()
+    for compression_ext, compression in COMPRESSION_EXTENSIONS.items()
+}
+
+# A FASTA batch is closed once it reaches either limit
+BATCH_MAX_RECORDS = 1000
+BATCH_MAX_BYTES = 16 * 1024 * 1024
 
 
 def calculate_gc_content(seq, mode="raw") -> float:
-    """Calculate GC content"""
-    seq = seq.upper()
-    gc = 0
-    canonical = 0
-
-    for base in seq:
-        if base in ("G", "C"):
-            gc += 1
-            canonical += 1
-        elif base in ("A", "T"):
-            canonical += 1
+    """Calculate GC content of a str, bytes or Bio.Seq.Seq sequence"""
+    if isinstance(seq, str):
+        # Non-ASCII characters become '?', which keeps the length and is not counted as a base
+        seq = seq.encode('ascii', 'replace')
+    elif not isinstance(seq, bytes):
+        seq = bytes(seq)
+
+    gc, canonical = _count_gc_bases(seq)
 
     if mode == "raw":
         denominator = len(seq)
@@ -29,147 +118,526 @@ def calculate_gc_content(seq, mode="raw") -> float:
     else:
         raise ValueError("Mode must be either 'raw' or 'canonical'")
 
-    if denominator == 0:
+    return _gc_percent(gc, denominator)
+
+
+def _count_gc_bases(buf: bytes) -> Tuple[int, int]:
+    """Count GC and canonical (ACGTU) bases"""
+    # One table-driven pass classifies every base, then two memchr-style counts
+    classes = buf.translate(_GC_TABLE)
+    gc = classes.count(b'\x01')
+    return gc, gc + classes.count(b'\x02')
+
+
+def _avg_phred(qual: bytes) -> float:
+    """Average PHRED score of a Sanger (offset 33) quality string"""
+    if not qual:
         return 0.0
+    return float(np.frombuffer(qual, dtype=np.uint8).mean()) - 33.0
+
 
+def _gc_percent(gc: int, denominator: int) -> float:
+    """GC percentage rounded like calculate_gc_content"""
+    if denominator == 0:
+        return 0.0
     return round((gc / denominator) * 100, 2)
 
 
-def detect_compression(filename: str) -> str:
-    """Detect compression type from filename"""
-    filename_lower = filename.lower()
+def _batch_gc_content(batch: List[str]) -> List[float]:
+    """
+    GC percentage of each sequence in a batch (runs in a worker process)
+    Encoding to bytes happens here, so the request thread never copies the sequences
+    """
+    return [calculate_gc_content(seq) for seq in batch]
+
+
+def _record_batches(records):
+    """Group (id, description, seq) records into batches bounded by count and size"""
+    batch = []
+    batch_bytes = 0
+
+    for record in records:
+        batch.append(record)
+        batch_bytes += len(record[2])
+
+        if len(batch) >= BATCH_MAX_RECORDS or batch_bytes >= BATCH_MAX_BYTES:
+            yield batch
+            batch = []
+            batch_bytes = 0
+
+    if batch:
+        yield batch
+
+
+@lru_cache(maxsize=1024)
+def detect_file_type(filename: str) -> Tuple[str, str]:
+    """Detect biological file format and compression type from the extension"""
+    parts = filename.lower().rsplit('.', 2)
+
+    # Try the double suffix first (e.g. '.fq.gz'), then the plain one (e.g. '.fq')
+    if len(parts) == 3 and f".{parts[1]}.{parts[2]}" in _SUFFIX_MAP:
+        return _SUFFIX_MAP[f".{parts[1]}.{parts[2]}"]
+    if len(parts) >= 2 and f".{parts[-1]}" in _SUFFIX_MAP:
+        return _SUFFIX_MAP[f".{parts[-1]}"]
+
+    raise ValueError(f"Unsupported file format: {filename}")
+
+
+class _ReadableStream(io.RawIOBase):
+    """
+    Raw stream view over any object with read()
+    SpooledTemporaryFile (UploadFile.file) has no readable() before Python 3.11, which TextIOWrapper needs
+    """
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._raw.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def get_text_handle(raw, compression: str):
+    """
+    Wrap a binary file object in a text-mode file handle
+    Decompression and decoding happen lazily as SeqIO reads
+    """
+    if compression == 'gzip':
+        return gzip.open(raw, 'rt')  # 'rt' = read text mode
+
+    elif compression == 'bzip2':
+        return bz2.open(raw, 'rt')
 
-    if filename_lower.endswith(('.gz', '.gzip')):
-        return 'gzip'
-    elif filename_lower.endswith(('.bz2', '.bzip2')):
-        return 'bzip2'
-    else:
-        return 'none'
-
-
-def detect_file_format(filename: str) -> str:
-    """Detect biological file format from extension"""
-    name = filename.lower()
-
-    # Remove compression extensions
-    for ext in ['.gz', '.gzip', '.bz2', '.bzip2']:
-        if name.endswith(ext):
-            name = name[:-len(ext)]
-
-    # Check biological format
-    if name.endswith(('.fa', '.fasta', '.fna')):
-        return 'fasta'
-    elif name.endswith(('.fq', '.fastq')):
-        return 'fastq'
-    elif name.endswith(('.gb', '.gbk', '.genbank')):
-        return 'genbank'
-    elif name.endswith('.embl'):
-        return 'embl'
     else:
-        raise ValueError(f"Unsupported file format: {filename}")
+        if not hasattr(raw, 'readable'):
+            raw = io.BufferedReader(_ReadableStream(raw))
+        # Headers may hold non-ASCII text; skip newline translation as the parsers strip '\r'
+        return io.TextIOWrapper(raw, encoding='utf-8', newline='')
 
 
-def get_text_handle(content: bytes, compression: str):
+def get_binary_handle(raw, compression: str):
     """
-    Convert bytes to text-mode file handle
-    Returns a file-like object that SeqIO can read
+    Wrap a binary file object in a decompressing binary-mode file handle
+    Used by the byte-level FASTQ parser, which never decodes to str
     """
     if compression == 'gzip':
-        binary_io = io.BytesIO(content)
-        return gzip.open(binary_io, 'rt')  # 'rt' = read text mode
+        return gzip.open(raw, 'rb')
 
     elif compression == 'bzip2':
-        binary_io = io.BytesIO(content)
-        return bz2.open(binary_io, 'rt')
+        return bz2.open(raw, 'rb')
 
     else:
-        # Uncompressed - decode to string
-        text_content = content.decode('utf-8')
-        return io.StringIO(text_content)
-
-
-def process_fasta_stream(file_handle, file_format: str = "fasta") -> List[Dict]:
-    """Process FASTA/GenBank files"""
-    records_data = []
-
-    for record in SeqIO.parse(file_handle, file_format):
-        record_info = {
-            "ID": record.id,
-            "Description": record.description,
-            "Sequence": str(record.seq),
-            "Length": len(record),
-            "GC_content": calculate_gc_content(record.seq),
-            "Last_base": str(record.seq[-1]) if len(record.seq) > 0 else "",
-            "First_base": str(record.seq[0]) if len(record.seq) > 0 else ""
-        }
-        records_data.append(record_info)
+        return raw
+
+
+def _read_line(buf: bytes, pos: int) -> Tuple[bytes, int]:
+    """Return the line starting at pos (without line ending) and the next position"""
+    end = buf.find(b'\n', pos)
+    if end == -1:
+        end = len(buf)
+    line = buf[pos:end]
+    if line.endswith(b'\r'):
+        line = line[:-1]
+    return line, end + 1
+
+
+def _fastq_id(title: bytes) -> bytes:
+    """Record ID (first whitespace-separated word) of a FASTQ title without the '@'"""
+    fields = title.split(None, 1)
+    return fields[0] if fields else b''
+
+
+def _fixed_length_record(buf: bytes, pos: int, read_len: int) -> Optional[Tuple[int, int, int]]:
+    """
+    Locate the record at pos by offset arithmetic, assuming reads of read_len and a bare '+' line
+    Returns (title_end, seq_start, next_pos), or None if the record does not have that layout
+    """
+    if buf[pos] != 64:  # '@'
+        return None
+    title_end = buf.find(b'\n', pos)
+    if title_end == -1:
+        return None
+
+    seq_start = title_end + 1
+    seq_end = seq_start + read_len
+    qual_start = seq_end + 3
+    qual_end = qual_start + read_len
+
+    # The quality line must exist, even when read_len is 0
+    if buf[seq_end:qual_start] != b'\n+\n' or qual_start >= len(buf) or qual_end > len(buf):
+        return None
+    if qual_end < len(buf) and buf[qual_end] != 10:  # '\n'
+        return None
+    # A newline inside either slice means this read is shorter than read_len
+    if buf.find(b'\n', seq_start, seq_end) != -1 or buf.find(b'\n', qual_start, qual_end) != -1:
+        return None
+
+    return title_end, seq_start, qual_end + 1
+
+
+def _scan_fastq_record(buf: bytes, pos: int) -> Tuple[bytes, bytes, bytes, int, bool]:
+    """
+    Parse the record whose '@' title line starts at pos, following FastqGeneralIterator's rules:
+    sequence lines run up to the first line starting with '+', and quality lines are read until
+    they are at least as long as the sequence and the next line starts with '@'
+    Returns (title, seq, qual, next_pos, four_line), title without the '@'; four_line is True for
+    a plain four-line record with '\n' endings and a bare '+' line
+    """
+    end = len(buf)
+    record_start = pos
+    title_line, pos = _read_line(buf, pos)
+    title = title_line[1:].rstrip()
+
+    seq_lines = []
+    while True:
+        if pos >= end:
+            if b''.join(seq_lines):
+                raise ValueError("End of file without quality information.")
+            raise ValueError("Unexpected end of file")
+        plus_line, pos = _read_line(buf, pos)
+        if plus_line[:1] == b'+':
+            break
+        seq_lines.append(plus_line.rstrip())
+
+    second_title = plus_line[1:].rstrip()
+    if second_title and second_title != title:
+        raise ValueError("Sequence and quality captions differ.")
+    seq = b''.join(seq_lines)
+    if b' ' in seq or b'\t' in seq:
+        raise ValueError("Whitespace is not allowed in the sequence.")
+
+    if pos >= end:
+        raise ValueError("Unexpected end of file")
+    qual_lines = []
+    qual_len = 0
+    while pos < end:
+        if buf[pos] == 64 and qual_len >= len(seq):  # '@' starts the next record
+            break
+        line, pos = _read_line(buf, pos)
+        line = line.rstrip()
+        qual_lines.append(line)
+        qual_len += len(line)
+    qual = b''.join(qual_lines)
+
+    if len(seq) != len(qual):
+        raise ValueError(
+            f"Lengths of sequence and quality values differs for {title.decode('utf-8')} "
+            f"({len(seq)} and {len(qual)})."
+        )
+
+    four_line = (
+        len(seq_lines) == 1 and len(qual_lines) == 1 and plus_line == b'+'
+        and buf.find(b'\r', record_start, pos) == -1
+    )
+    return title, seq, qual, min(pos, end), four_line
+
+
+def _iter_fastq_bytes(buf: bytes, wanted_ids: Optional[Set[bytes]] = None):
+    """
+    Iterate over FASTQ records in a bytes buffer, accepting what FastqGeneralIterator accepts
+    Yields (title, seq, qual) as bytes, title without the leading '@'
+    If wanted_ids is given, other records are skipped
+    """
+    pos = 0
+    end = len(buf)
+
+    # Read length of the last scanned record, if it was a plain four-line record.
+    # While later records match that layout they are sliced by offset instead of line by line.
+    read_len = None
+
+    while pos < end:
+        if read_len is not None:
+            located = _fixed_length_record(buf, pos, read_len)
+            if located is not None:
+                title_end, seq_start, next_pos = located
+                title = buf[pos + 1:title_end].rstrip()
+                pos = next_pos
+
+                if wanted_ids and _fastq_id(title) not in wanted_ids:
+                    continue
+
+                seq = buf[seq_start:seq_start + read_len]
+                if b' ' in seq or b'\t' in seq:
+                    raise ValueError("Whitespace is not allowed in the sequence.")
+                qual_start = seq_start + read_len + 3
+                yield title, seq, buf[qual_start:qual_start + read_len]
+                continue
+
+        if buf[pos] in b'\r\n':
+            # Tolerate blank lines between records / at end of file
+            _, pos = _read_line(buf, pos)
+            continue
+        if buf[pos] != 64:  # '@'
+            raise ValueError("Records in Fastq files should start with '@' character")
+
+        title, seq, qual, pos, four_line = _scan_fastq_record(buf, pos)
+        read_len = len(seq) if four_line else None
+
+        if wanted_ids and _fastq_id(title) not in wanted_ids:
+            continue
+        yield title, seq, qual
 
-    return records_data
+
+def _index_fastq_bytes(buf: bytes) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Index the records of a FASTQ buffer as (ids, starts, ends) arrays sorted by record ID
+    Duplicate IDs keep their file order; spans cover the whole (possibly wrapped) record
+    """
+    ids = []
+    starts = []
+    ends = []
+    pos = 0
+    end = len(buf)
+
+    while pos < end:
+        if buf[pos] in b'\r\n':
+            _, pos = _read_line(buf, pos)
+            continue
+        if buf[pos] != 64:  # '@'
+            raise ValueError("Records in Fastq files should start with '@' character")
+
+        start = pos
+        title, _, _, pos, _ = _scan_fastq_record(buf, pos)
+        ids.append(_fastq_id(title))
+        starts.append(start)
+        ends.append(pos)
+
+    ids = np.array(ids, dtype=np.bytes_)
+    order = np.argsort(ids, kind='stable')
+    return ids[order], np.array(starts, dtype=np.int64)[order], np.array(ends, dtype=np.int64)[order]
+
+
+def _wanted_spans(index: Tuple[np.ndarray, np.ndarray, np.ndarray], wanted_ids: Set[str]) -> List[Tuple[int, int]]:
+    """Byte spans of the wanted records, in file order"""
+    ids, starts, ends = index
+    spans = []
+
+    for record_id in wanted_ids:
+        key = record_id.encode('utf-8')
+        # Longer keys would be truncated to the array's width and could match a prefix
+        if len(key) > ids.dtype.itemsize:
+            continue
+        lo = np.searchsorted(ids, key, side='left')
+        hi = np.searchsorted(ids, key, side='right')
+        spans.extend(zip(starts[lo:hi].tolist(), ends[lo:hi].tolist()))
+
+    return sorted(spans)
+
+
+def _join_records(chunks: List[bytes]) -> bytes:
+    """Concatenate FASTQ records; the last record of a file may lack a trailing newline"""
+    return b''.join(chunk if chunk.endswith(b'\n') else chunk + b'\n' for chunk in chunks)
+
+
+def _cache_fastq_index(key: str, buf: bytes, index: Tuple[np.ndarray, np.ndarray, np.ndarray]):
+    """Spill the decompressed FASTQ to disk and cache its index, evicting old entries to stay in budget"""
+    index_bytes = sum(array.nbytes for array in index)
+    if len(buf) > FASTQ_INDEX_MAX_DISK_BYTES or index_bytes > FASTQ_INDEX_MAX_MEMORY_BYTES:
+        return
+
+    with tempfile.NamedTemporaryFile(suffix='.fastq', delete=False) as tmp:
+        tmp.write(buf)
+
+    with _fastq_index_lock:
+        if key in _fastq_index_cache:
+            # Another request indexed the same upload meanwhile
+            os.remove(tmp.name)
+            return
+
+        _fastq_index_cache[key] = (tmp.name, len(buf), index)
+
+        while (
+                len(_fastq_index_cache) > FASTQ_INDEX_MAX_ENTRIES
+                or sum(size for _, size, _ in _fastq_index_cache.values()) > FASTQ_INDEX_MAX_DISK_BYTES
+                or sum(array.nbytes for _, _, arrays in _fastq_index_cache.values() for array in arrays)
+                > FASTQ_INDEX_MAX_MEMORY_BYTES
+        ):
+            _, (old_path, _, _) = _fastq_index_cache.popitem(last=False)
+            os.remove(old_path)
+
+
+def fetch_indexed_fastq(raw, compression: str, wanted_ids: Set[str]) -> bytes:
+    """
+    Return just the wanted FASTQ records (in file order) from an upload
+    The first call for an upload indexes it; repeat calls seek into the cached decompressed copy
+    """
+    digest = hashlib.sha256(compression.encode('ascii'))
+    for chunk in iter(lambda: raw.read(1024 * 1024), b''):
+        digest.update(chunk)
+    raw.seek(0)
+    key = digest.hexdigest()
+
+    cached = None
+    with _fastq_index_lock:
+        if key in _fastq_index_cache:
+            _fastq_index_cache.move_to_end(key)
+            path, _, index = _fastq_index_cache[key]
+            cached = open(path, 'rb')
+
+    if cached is not None:
+        chunks = []
+        with cached:
+            for start, stop in _wanted_spans(index, wanted_ids):
+                cached.seek(start)
+                chunks.append(cached.read(stop - start))
+        return _join_records(chunks)
+
+    buf = get_binary_handle(raw, compression).read()
+    index = _index_fastq_bytes(buf)
+    records = _join_records([buf[start:stop] for start, stop in _wanted_spans(index, wanted_ids)])
+
+    _cache_fastq_index(key, buf, index)
+    return records
+
+
+def iter_sequence_bytes(raw, compression: str, file_format: str):
+    """Yield only the sequence of each record as bytes (no SeqRecord for FASTA/FASTQ)"""
+    if file_format == 'fastq':
+        handle = get_binary_handle(raw, compression)
+        for _, seq, _ in _iter_fastq_bytes(handle.read()):
+            yield seq
+
+    elif file_format == 'fasta':
+        handle = get_text_handle(raw, compression)
+        for _, seq in SimpleFastaParser(handle):
+            yield seq.encode('ascii', 'replace')
+
+    else:
+        handle = get_text_handle(raw, compression)
+        for record in SeqIO.parse(handle, file_format):
+            yield bytes(record.seq)
+
+
+def encode_response(result: Dict, accept: Optional[str] = None):
+    """
+    Encode the result in the best format the client accepts
+    Arrow IPC stream (results with sequences only), then msgpack, then JSON via orjson
+    In the Arrow stream the non-sequence fields travel as JSON schema metadata
+    """
+    accept = accept or ""
+
+    if "sequences" not in result or ARROW_STREAM_MEDIA_TYPE not in accept:
+        if MSGPACK_MEDIA_TYPE in accept:
+            return Response(content=ormsgpack.packb(result), media_type=MSGPACK_MEDIA_TYPE)
+        return Response(content=orjson.dumps(result), media_type="application/json")
+
+    summary = {key: value for key, value in result.items() if key != "sequences"}
+    table = pa.table(result["sequences"]).replace_schema_metadata({"summary": json.dumps(summary)})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    return Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_STREAM_MEDIA_TYPE)
+
+
+def process_fasta_stream(file_handle, file_format: str = "fasta") -> Dict[str, List]:
+    """Process FASTA/GenBank files into parallel per-column lists"""
+    columns = {name: [] for name in FASTA_COLUMNS}
+
+    if file_format == 'fasta':
+        # Low-level parser yields (title, sequence) strings without building SeqRecords
+        records = (
+            (title.split(None, 1)[0] if title else "", title, seq)
+            for title, seq in SimpleFastaParser(file_handle)
+        )
+    else:
+        # GenBank/EMBL need the full SeqRecord parser
+        records = (
+            (record.id, record.description, str(record.seq))
+            for record in SeqIO.parse(file_handle, file_format)
+        )
+
+    # Parsing stays sequential; GC for each batch runs in the worker pool meanwhile
+    pending = []
+
+    for batch in _record_batches(records):
+        for record_id, description, seq in batch:
+            columns["ID"].append(record_id)
+            columns["Description"].append(description)
+            columns["Sequence"].append(seq)
+            columns["Length"].append(len(seq))
+            columns["Last_base"].append(seq[-1:])
+            columns["First_base"].append(seq[:1])
+
+        seq_batch = [seq for _, _, seq in batch]
+        # A lone (typically huge) record costs more to pickle to a worker than to count inline
+        if _executor is not None and len(seq_batch) > 1:
+            pending.append(_executor.submit(_batch_gc_content, seq_batch))
+        else:
+            columns["GC_content"].extend(_batch_gc_content(seq_batch))
+
+    # Futures are collected in submission order, so GC values line up with records
+    for future in pending:
+        columns["GC_content"].extend(future.result())
+
+    return columns
 
 
-def process_fastq_stream(file_handle, wanted_ids: Optional[Set[str]] = None) -> List[Dict]:
-    """Process FASTQ files with optional filtering"""
+def process_fastq_stream(file_handle, wanted_ids: Optional[Set[str]] = None) -> Dict[str, List]:
+    """Process FASTQ files with optional filtering into parallel per-column lists"""
     if wanted_ids is None:
         wanted_ids = set()
 
-    records_data = []
+    columns = {name: [] for name in FASTQ_COLUMNS}
 
-    # Read content for FastqGeneralIterator
+    # Parse the raw buffer so sequence and quality never leave bytes
     content = file_handle.read()
-    if isinstance(content, bytes):
-        content = content.decode('utf-8')
+    if isinstance(content, str):
+        content = content.encode('utf-8')
 
-    for title, seq, qual in FastqGeneralIterator(io.StringIO(content)):
-        record_id = title.split(None, 1)[0]
+    wanted = {record_id.encode('utf-8') for record_id in wanted_ids}
 
-        if wanted_ids and record_id not in wanted_ids:
-            continue
+    for title_bytes, seq, qual in _iter_fastq_bytes(content, wanted):
+        title = title_bytes.decode('utf-8')
+        record_id = title.split(None, 1)[0] if title else ""
 
-        record_info = {
-            "ID": record_id,
-            "Title": title,
-            "Sequence": seq,
-            "Quality": qual,
-            "Length": len(seq),
-            "GC_content": calculate_gc_content(seq),
-            "Avg_quality": sum(ord(q) - 33 for q in qual) / len(qual) if qual else 0
-        }
-        records_data.append(record_info)
+        columns["ID"].append(record_id)
+        columns["Title"].append(title)
+        columns["Sequence"].append(seq.decode('ascii'))
+        columns["Quality"].append(qual.decode('ascii'))
+        columns["Length"].append(len(seq))
+        columns["GC_content"].append(calculate_gc_content(seq))
+        columns["Avg_quality"].append(_avg_phred(qual))
 
-    return records_data
+    return columns
 
 
 @app.post("/sequences/process/")
-async def process_sequences_universal(file: UploadFile = File(...)):
+def process_sequences_universal(
+        file: UploadFile = File(...),
+        accept: Optional[str] = Header(None)
+):
     """
     Universal endpoint - handles FASTA, FASTQ, GenBank
     Supports compressed (.gz, .bz2) files
     """
     try:
         # Detect compression and format
-        compression = detect_compression(file.filename)
-        file_format = detect_file_format(file.filename)
+        file_format, compression = detect_file_type(file.filename)
 
-        # CRITICAL FIX: Read file content first (await the async operation)
-        content = await file.read()
+        # Stream the spooled upload through the decompressor instead of buffering it
+        raw = file.file
 
-        # Then get text handle from bytes (synchronous operation)
-        handle = get_text_handle(content, compression)
-
-        # Process based on format
         if file_format == 'fastq':
+            handle = get_binary_handle(raw, compression)
             sequences = process_fastq_stream(handle)
         else:
+            handle = get_text_handle(raw, compression)
             sequences = process_fasta_stream(handle, file_format=file_format)
 
-        return {
+        return encode_response({
             "filename": file.filename,
             "format": file_format,
             "compression": compression,
-            "total_sequences": len(sequences),
-            "total_bases": sum(s["Length"] for s in sequences),
+            "total_sequences": len(sequences["ID"]),
+            "total_bases": sum(sequences["Length"]),
             "sequences": sequences
-        }
+        }, accept)
 
     except ValueError as e:
         raise HTTPException(400, str(e))
@@ -178,36 +646,36 @@ async def process_sequences_universal(file: UploadFile = File(...)):
 
 
 @app.post("/sequences/stats/")
-async def get_sequence_stats(file: UploadFile = File(...)):
+def get_sequence_stats(
+        file: UploadFile = File(...),
+        accept: Optional[str] = Header(None)
+):
     """Get statistics only - more memory efficient"""
     try:
-        compression = detect_compression(file.filename)
-        file_format = detect_file_format(file.filename)
-
-        # CRITICAL FIX: await file.read() first
-        content = await file.read()
-        handle = get_text_handle(content, compression)
+        file_format, compression = detect_file_type(file.filename)
 
-        # Calculate stats
+        # Calculate stats from pooled base counts
         total_length = 0
         total_gc = 0
+        total_canonical = 0
         count = 0
 
-        for record in SeqIO.parse(handle, file_format):
-            total_length += len(record)
-            gc_content = calculate_gc_content(record.seq)
-            total_gc += gc_content
+        for seq in iter_sequence_bytes(file.file, compression, file_format):
+            gc, canonical = _count_gc_bases(seq)
+            total_length += len(seq)
+            total_gc += gc
+            total_canonical += canonical
             count += 1
 
-        return {
+        return encode_response({
             "filename": file.filename,
             "format": file_format,
             "compression": compression,
             "total_sequences": count,
             "total_bases": total_length,
             "average_length": round(total_length / count, 2) if count > 0 else 0,
-            "average_gc_content": round(total_gc / count, 2) if count > 0 else 0
-        }
+            "average_gc_content": _gc_percent(total_gc, total_canonical)
+        }, accept)
 
     except ValueError as e:
         raise HTTPException(400, str(e))
@@ -216,17 +684,17 @@ async def get_sequence_stats(file: UploadFile = File(...)):
 
 
 @app.post("/fastq/filter/")
-async def filter_fastq(
+def filter_fastq(
         file: UploadFile = File(...),
-        filter_ids: Optional[str] = None
+        filter_ids: Optional[str] = None,
+        accept: Optional[str] = Header(None)
 ):
     """
     FASTQ-specific endpoint with ID filtering
     Supports compressed files
     """
     try:
-        compression = detect_compression(file.filename)
-        file_format = detect_file_format(file.filename)
+        file_format, compression = detect_file_type(file.filename)
 
         if file_format != 'fastq':
             raise HTTPException(400, "This endpoint only accepts FASTQ files")
@@ -236,20 +704,22 @@ async def filter_fastq(
         if filter_ids:
             wanted_ids = set(id.strip() for id in filter_ids.split(","))
 
-        # CRITICAL FIX: await file.read() first
-        content = await file.read()
-        handle = get_text_handle(content, compression)
+        if wanted_ids:
+            # Seek straight to the wanted records; repeat calls on the same upload reuse the index
+            handle = io.BytesIO(fetch_indexed_fastq(file.file, compression, wanted_ids))
+        else:
+            handle = get_binary_handle(file.file, compression)
 
         sequences = process_fastq_stream(handle, wanted_ids=wanted_ids)
 
-        return {
+        return encode_response({
             "filename": file.filename,
             "compression": compression,
-            "total_sequences": len(sequences),
+            "total_sequences": len(sequences["ID"]),
             "filtered": bool(wanted_ids),
             "filter_count": len(wanted_ids) if wanted_ids else 0,
             "sequences": sequences
-        }
+        }, accept)
 
     except ValueError as e:
         raise HTTPException(400, str(e))
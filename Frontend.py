@@ -1,8 +1,13 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from requests_toolbelt import MultipartEncoder
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import pyarrow as pa
+import ormsgpack
 from io import StringIO
 import json
 
@@ -16,6 +21,11 @@ st.set_page_config(
 # API base URL - change if your API runs on different port
 API_BASE_URL = "http://localhost:8000"
 
+# Binary response formats: Arrow IPC for sequence payloads (columnar), msgpack for the rest
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+ACCEPT_HEADER = f"{ARROW_STREAM_MEDIA_TYPE}, {MSGPACK_MEDIA_TYPE}, application/json;q=0.5"
+
 # Custom CSS for better styling
 st.markdown("""
     <style>
@@ -33,23 +43,70 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+@st.cache_resource
+def _session():
+    """Shared HTTP session so API calls reuse keep-alive connections"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 def check_api_health():
     """Check if API is running"""
     try:
-        response = requests.get(f"{API_BASE_URL}/")
+        response = _session().get(f"{API_BASE_URL}/")
         return response.status_code == 200
     except:
         return False
 
 
+def decode_response(response):
+    """
+    Decode an API response according to its content type
+    Whatever the format, sequences (if present) come back as a DataFrame
+    """
+    content_type = response.headers.get("content-type", "")
+
+    if content_type.startswith(ARROW_STREAM_MEDIA_TYPE):
+        reader = pa.ipc.open_stream(response.content)
+        result = json.loads(reader.schema.metadata[b"summary"])
+        result["sequences"] = reader.read_pandas()
+        return result
+
+    if content_type.startswith(MSGPACK_MEDIA_TYPE):
+        result = ormsgpack.unpackb(response.content)
+    else:
+        result = response.json()
+
+    # msgpack/JSON carry sequences as a dict of columns
+    if isinstance(result.get("sequences"), dict):
+        result["sequences"] = pd.DataFrame(result["sequences"])
+
+    return result
+
+
+def post_file(endpoint, file, params=None):
+    """POST an uploaded file as a multipart body streamed from its buffer"""
+    file.seek(0)
+    encoder = MultipartEncoder(fields={"file": (file.name, file, file.type)})
+
+    return _session().post(
+        f"{API_BASE_URL}{endpoint}",
+        data=encoder,
+        params=params,
+        headers={"Content-Type": encoder.content_type, "Accept": ACCEPT_HEADER}
+    )
+
+
 def process_sequences(file, endpoint="/sequences/process/"):
     """Send file to API and get results"""
     try:
-        files = {"file": (file.name, file.getvalue(), file.type)}
-        response = requests.post(f"{API_BASE_URL}{endpoint}", files=files)
+        response = post_file(endpoint, file)
 
         if response.status_code == 200:
-            return response.json(), None
+            return decode_response(response), None
         else:
             return None, f"Error {response.status_code}: {response.text}"
     except Exception as e:
@@ -59,17 +116,11 @@ def process_sequences(file, endpoint="/sequences/process/"):
 def process_with_filter(file, filter_ids):
     """Process FASTQ with ID filtering"""
     try:
-        files = {"file": (file.name, file.getvalue(), file.type)}
         params = {"filter_ids": filter_ids} if filter_ids else {}
-
-        response = requests.post(
-            f"{API_BASE_URL}/fastq/filter/",
-            files=files,
-            params=params
-        )
+        response = post_file("/fastq/filter/", file, params=params)
 
         if response.status_code == 200:
-            return response.json(), None
+            return decode_response(response), None
         else:
             return None, f"Error {response.status_code}: {response.text}"
     except Exception as e:
@@ -79,11 +130,10 @@ def process_with_filter(file, filter_ids):
 def get_stats_only(file):
     """Get statistics without full sequence data"""
     try:
-        files = {"file": (file.name, file.getvalue(), file.type)}
-        response = requests.post(f"{API_BASE_URL}/sequences/stats/", files=files)
+        response = post_file("/sequences/stats/", file)
 
         if response.status_code == 200:
-            return response.json(), None
+            return decode_response(response), None
         else:
             return None, f"Error {response.status_code}: {response.text}"
     except Exception as e:
@@ -92,7 +142,7 @@ def get_stats_only(file):
 
 def plot_gc_distribution(sequences):
     """Create GC content distribution plot"""
-    gc_values = [seq["GC_content"] for seq in sequences]
+    gc_values = np.asarray(sequences["GC_content"], dtype=np.float32)
 
     fig = px.histogram(
         x=gc_values,
@@ -112,7 +162,7 @@ def plot_gc_distribution(sequences):
 
 def plot_length_distribution(sequences):
     """Create sequence length distribution plot"""
-    lengths = [seq["Length"] for seq in sequences]
+    lengths = np.asarray(sequences["Length"], dtype=np.int64)
 
     fig = px.histogram(
         x=lengths,
@@ -132,13 +182,10 @@ def plot_length_distribution(sequences):
 
 def plot_base_composition(sequences):
     """Plot first and last base composition"""
-    first_bases = [seq["First_base"] for seq in sequences if "First_base" in seq]
-    last_bases = [seq["Last_base"] for seq in sequences if "Last_base" in seq]
-
     # Count bases
     from collections import Counter
-    first_counts = Counter(first_bases)
-    last_counts = Counter(last_bases)
+    first_counts = Counter(sequences["First_base"])
+    last_counts = Counter(sequences["Last_base"])
 
     fig = go.Figure(data=[
         go.Bar(name='First Base', x=list(first_counts.keys()), y=list(first_counts.values())),
@@ -264,11 +311,10 @@ def main():
                         st.metric("Filter Count", result.get("filter_count", 0))
 
                     # Display sequences
-                    if result["sequences"]:
-                        st.subheader("📋 Filtered Sequences")
+                    df = result["sequences"]
 
-                        # Convert to DataFrame
-                        df = pd.DataFrame(result["sequences"])
+                    if not df.empty:
+                        st.subheader("📋 Filtered Sequences")
 
                         # Show interactive table
                         st.dataframe(
@@ -333,8 +379,8 @@ def main():
                     tab1, tab2, tab3, tab4 = st.tabs(["📋 Data Table", "📊 Visualizations", "🔍 Details", "📥 Export"])
 
                     with tab1:
-                        # Convert to DataFrame
-                        df = pd.DataFrame(result["sequences"])
+                        # Sequences arrive as a DataFrame already
+                        df = result["sequences"]
 
                         # Show summary stats
                         st.subheader("Summary Statistics")
@@ -365,7 +411,7 @@ def main():
                             st.plotly_chart(plot_length_distribution(result["sequences"]), use_container_width=True)
 
                         # Base composition if available
-                        if "First_base" in result["sequences"][0]:
+                        if "First_base" in df.columns:
                             st.plotly_chart(plot_base_composition(result["sequences"]), use_container_width=True)
 
                     with tab3:
@@ -374,11 +420,11 @@ def main():
                         # Sequence selector
                         sequence_index = st.selectbox(
                             "Select sequence to view",
-                            range(len(result["sequences"])),
-                            format_func=lambda x: result["sequences"][x]["ID"]
+                            range(len(df)),
+                            format_func=lambda x: df["ID"].iloc[x]
                         )
 
-                        selected_seq = result["sequences"][sequence_index]
+                        selected_seq = df.iloc[sequence_index]
 
                         # Display details
                         col1, col2 = st.columns(2)
@@ -423,7 +469,10 @@ def main():
                         )
 
                         # JSON export
-                        json_str = json.dumps(result, indent=2)
+                        json_str = json.dumps(
+                            {**result, "sequences": df.to_dict(orient="records")},
+                            indent=2
+                        )
                         st.download_button(
                             label="⬇️ Download as JSON",
                             data=json_str,